@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""Benchmark the parsers and solvers against fixed-seed generated inputs,
+and compare the results with a stored baseline"""
+
+import argparse
+import json
+import os
+import sys
+
+import day1
+import day2
+import day3
+import day4
+import day5
+import day6
+import day7
+from generate import generate
+from helpers import benchmark
+from parsing import lines
+
+SEED = 2023
+SIZES = (1, 10)
+BASELINE = "bench_baseline.json"
+# How much slower (or bigger) than the baseline counts as a regression
+THRESHOLD = 0.25
+# Extra generator options for some days
+OPTIONS = {
+    # Keep the matches sparse, phase2 simulates every copy won
+    4: {"density": 0.05},
+}
+
+
+def day5_sample_seeds(almanac: day5.Almanac) -> list:
+    """The first few thousand seeds of the first seed range"""
+    start, end = almanac.seed_ranges[0]
+    return list(range(start, min(end, start + 10000)))
+
+
+def day5_sample_almanac(text: str) -> day5.Almanac:
+    """The almanac with every seed range cut to its first few thousand seeds,
+    small enough to sweep"""
+    almanac = day5.read_almanac(text)
+    for i in range(1, len(almanac.seeds), 2):
+        almanac.seeds[i] = min(almanac.seeds[i], 10000)
+    return almanac
+
+
+def bench_day1_stage1(text: str):
+    lines = text.split()
+    return lambda: [day1.get_calibration_value_stage1(x) for x in lines]
+
+
+def bench_day1_stage2(text: str):
+    lines = text.split()
+    return lambda: [day1.get_calibration_value_stage2(x) for x in lines]
+
+
+def bench_day1_scan(text: str):
+    lines = text.split()
+    return lambda: [day1.get_calibration_value_scan(x) for x in lines]
+
+
+def bench_day2_solve(text: str):
+    return lambda: day2.solve(text)
+
+
+def bench_day2_parse_games(text: str):
+    return lambda: day2.parse_games(text)
+
+
+def bench_day3_create_map(text: str):
+    return lambda: day3.sum_good_parts(*day3.create_map(text))
+
+
+def bench_day3_grid(text: str):
+    return lambda: day3.sum_good_parts_grid(day3.create_grid(text))
+
+
+def bench_day3_stream(text: str):
+    return lambda: day3.sum_schematic_stream(text.split("\n"))
+
+
+def bench_day4_phase1(text: str):
+    return lambda: day4.phase1(text)
+
+
+def bench_day4_phase1_linear(text: str):
+    return lambda: day4.phase1_linear(text)
+
+
+def bench_day4_phase2(text: str):
+    return lambda: day4.phase2(text)
+
+
+def bench_day4_phase2_linear(text: str):
+    return lambda: day4.phase2_linear(text)
+
+
+def bench_day5_parse(text: str):
+    return lambda: day5.read_almanac(text)
+
+
+def bench_day5_get_mapping(text: str):
+    almanac = day5.read_almanac(text)
+    seeds = day5_sample_seeds(almanac)
+    return lambda: [day5.get_mapping(almanac, s, "seed-to-soil") for s in seeds]
+
+
+def bench_day5_seed_to_location(text: str):
+    almanac = day5.read_almanac(text)
+    seeds = day5_sample_seeds(almanac)
+    return lambda: [day5.seed_to_location(almanac, s) for s in seeds]
+
+
+def bench_day5_ranges(text: str):
+    return lambda: day5.lowest_location_ranges(day5.read_almanac(text))
+
+
+def bench_day5_sweep(text: str):
+    almanac = day5_sample_almanac(text)
+    return lambda: day5.lowest_location_sweep(almanac, workers=1)
+
+
+def bench_day5_reverse(text: str):
+    almanac = day5_sample_almanac(text)
+    return lambda: day5.lowest_location_reverse(almanac)
+
+
+def bench_day6_strategies(text: str):
+    races = day6.get_races(text)
+    return lambda: [day6.strategies(day6.results(r), int(r[1])) for r in races]
+
+
+def bench_day6_ways_to_win(text: str):
+    races = day6.get_races(text)
+    return lambda: [day6.ways_to_win(r) for r in races]
+
+
+def bench_day7_parse_hands(text: str):
+    return lambda: day7.parse_hands(text)
+
+
+def bench_day7_score_hand(text: str):
+    hands = day7.parse_hands(text)
+    return lambda: sorted(hands, key=lambda L: day7.score_hand(L[0]))
+
+
+def bench_day7_read_hand_store(text: str):
+    return lambda: day7.read_hand_store(lines(text))
+
+
+def bench_day7_total_winnings(text: str):
+    store = day7.read_hand_store(lines(text))
+    return lambda: day7.total_winnings(store)
+
+
+# name: (day, setup), setup(input) returns the function to be timed
+CASES = {
+    "day1.get_calibration_value_stage1": (1, bench_day1_stage1),
+    "day1.get_calibration_value_stage2": (1, bench_day1_stage2),
+    "day1.get_calibration_value_scan": (1, bench_day1_scan),
+    "day2.solve": (2, bench_day2_solve),
+    "day2.parse_games": (2, bench_day2_parse_games),
+    "day3.create_map": (3, bench_day3_create_map),
+    "day3.create_grid": (3, bench_day3_grid),
+    "day3.sum_schematic_stream": (3, bench_day3_stream),
+    "day4.phase1": (4, bench_day4_phase1),
+    "day4.phase1_linear": (4, bench_day4_phase1_linear),
+    "day4.phase2": (4, bench_day4_phase2),
+    "day4.phase2_linear": (4, bench_day4_phase2_linear),
+    "day5.read_almanac": (5, bench_day5_parse),
+    "day5.get_mapping": (5, bench_day5_get_mapping),
+    "day5.seed_to_location": (5, bench_day5_seed_to_location),
+    "day5.lowest_location_ranges": (5, bench_day5_ranges),
+    # The sweep and reverse search over the same sampled seeds
+    "day5.lowest_location_sweep": (5, bench_day5_sweep),
+    "day5.lowest_location_reverse": (5, bench_day5_reverse),
+    "day6.results+strategies": (6, bench_day6_strategies),
+    "day6.ways_to_win": (6, bench_day6_ways_to_win),
+    "day7.parse_hands": (7, bench_day7_parse_hands),
+    "day7.score_hand": (7, bench_day7_score_hand),
+    "day7.read_hand_store": (7, bench_day7_read_hand_store),
+    "day7.total_winnings": (7, bench_day7_total_winnings),
+}
+
+
+def run_suite(
+    names: list, sizes: tuple = SIZES, repeat: int = 5, warmup: int = 1
+) -> dict:
+    """Time each case at each size, returns {'name@size': result}"""
+    results = dict()
+    inputs = dict()
+    for name in names:
+        day, setup = CASES[name]
+        for size in sizes:
+            if (day, size) not in inputs:
+                options = OPTIONS.get(day, dict())
+                inputs[(day, size)] = generate(day, SEED, size, **options)
+            func = setup(inputs[(day, size)])
+            _, result = benchmark(func, repeat=repeat, warmup=warmup, memory=True)
+            result["name"] = name
+            result["size"] = size
+            # 1 and 1.0 are the same size, name them alike
+            key = f"{name}@{size:g}"
+            results[key] = result
+            print(
+                f"{key:44} {result['median_ms']:12.3f} msec"
+                f" {result['peak_memory_bytes']:14} bytes",
+                flush=True,
+            )
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float = THRESHOLD) -> list:
+    """Return a line for every result that regressed past the threshold"""
+    regressions = list()
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        for metric in ("median_ms", "peak_memory_bytes"):
+            before = baseline[key][metric]
+            after = result[metric]
+            if before and after > before * (1 + threshold):
+                regressions.append(
+                    f"{key} {metric}: {before:.3f} -> {after:.3f}"
+                    f" (+{(after / before - 1):.0%})"
+                )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "cases", nargs="*", help="only cases whose name contains one of these"
+    )
+    parser.add_argument("--sizes", nargs="+", type=float, default=SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument(
+        "--save", action="store_true", help="store these results as the baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=THRESHOLD,
+        help="allowed slowdown or growth over the baseline, 0.25 is 25%%",
+    )
+    args = parser.parse_args()
+
+    names = [n for n in CASES if not args.cases or any(c in n for c in args.cases)]
+    results = run_suite(names, tuple(args.sizes), args.repeat, args.warmup)
+
+    if args.save:
+        baseline = dict()
+        if os.path.exists(args.baseline):
+            with open(args.baseline, mode="r") as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, mode="w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Saved {len(results)} results to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, mode="r") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+    else:
+        print(f"No baseline at {args.baseline}, run with --save to store one")
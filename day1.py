@@ -1,22 +1,45 @@
 #!/usr/bin/env python3
-import requests
+from helpers import read_url as read_url
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import mmap
+import os
 import regex
 
-# Session cookie is valid for 10 years!
-COOKIEFILE = ".session_cookie"
 URL = "https://adventofcode.com/2023/day/1/input"
+TEST = """1abc2
+pqr3stu8vwx
+a1b2c3d4e5f
+treb7uchet"""
+TEST_STAGE2 = """two1nine
+eightwothree
+abcone2threexyz
+xtwone3four
+4nineeightseven2
+zoneight234
+7pqrstsixteen"""
 NUMS = ['zero','one','two','three','four','five','six','seven','eight','nine']
 
-def read_cookie(file: str) -> str:
-    """Get the AdventOfCode session cookie we saved earlier"""
-    with open(file, mode="r") as f:
-        return f.read().strip()
+def build_trie(words: dict) -> dict:
+    """Nested dicts keyed by character, the '' key holds the matched value"""
+    trie = dict()
+    for word, value in words.items():
+        node = trie
+        for c in word:
+            node = node.setdefault(c, dict())
+        node[''] = value
+    return trie
 
-def read_url(url: str) -> str:
-    """Get the unmolested data from a URL"""
-    session_cookie = { 'session': read_cookie(COOKIEFILE) }
-    with requests.get(url=url, timeout=5, cookies=session_cookie) as content:
-        return content.text
+# Digits and digit words, forwards for scanning from the left of a line and
+# backwards for scanning from the right
+DIGIT_WORDS = {str(n): str(n) for n in range(10)}
+DIGIT_WORDS.update({word: str(n) for n, word in enumerate(NUMS)})
+FORWARD_TRIE = build_trie(DIGIT_WORDS)
+BACKWARD_TRIE = build_trie({w[::-1]: n for w, n in DIGIT_WORDS.items()})
+# The same again over raw bytes, where each character is an int
+BYTES_DIGIT_TRIE = build_trie({str(n).encode(): str(n) for n in range(10)})
+BYTES_FORWARD_TRIE = build_trie({w.encode(): n for w, n in DIGIT_WORDS.items()})
+BYTES_BACKWARD_TRIE = build_trie({w[::-1].encode(): n for w, n in DIGIT_WORDS.items()})
 
 def numwords_to_nums(input: str) -> str:
     for numword in NUMS:
@@ -63,18 +86,116 @@ def get_calibration_value_stage2(text: str) -> int:
         # Otherwise, first and last digit
         return(int(digits[0] + digits[-1]))
 
+def find_digit(text: str, positions, trie: dict, step: int) -> str:
+    """Walk the trie from each position in turn (step is the direction to
+    read in) and return the first digit or digit word matched"""
+    for i in positions:
+        node = trie
+        j = i
+        while 0 <= j < len(text) and text[j] in node:
+            node = node[text[j]]
+            if '' in node:
+                return node['']
+            j += step
+    raise ValueError(f"No digits in {text!r}")
 
-if __name__ == "__main__":
-    input = (read_url(URL))
+def get_calibration_value_scan(text: str) -> int:
+    """Stage2 calibration value, scanning inward from both ends of the line"""
+    first = find_digit(text, range(len(text)), FORWARD_TRIE, 1)
+    last = find_digit(text, reversed(range(len(text))), BACKWARD_TRIE, -1)
+    return(int(first + last))
+
+def split_file(path: str, parts: int) -> list:
+    """Split a file into about equal [start, end) byte ranges, each ending
+    just after a newline so no line is cut in two"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    boundaries = [0]
+    with open(path, mode="rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for n in range(1, parts):
+                newline = mm.find(b"\n", max(size * n // parts, boundaries[-1]))
+                if newline == -1:
+                    break
+                boundaries.append(newline + 1)
+    boundaries.append(size)
+    return [(a, b) for a, b in zip(boundaries, boundaries[1:]) if a < b]
+
+def calibrate_range(path: str, start: int, end: int) -> tuple:
+    """Stage1 and stage2 sums for the lines in a byte range of a file, in one
+    pass over the memory mapped bytes"""
+    sum_stage1 = 0
+    sum_stage2 = 0
+    with open(path, mode="rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = start
+            while pos < end:
+                newline = mm.find(b"\n", pos, end)
+                if newline == -1:
+                    newline = end
+                line = mm[pos:newline].rstrip(b"\r")
+                pos = newline + 1
+                if not line:
+                    continue
+                forwards = range(len(line))
+                first = find_digit(line, forwards, BYTES_DIGIT_TRIE, 1)
+                last = find_digit(line, reversed(forwards), BYTES_DIGIT_TRIE, -1)
+                sum_stage1 += int(first + last)
+                first = find_digit(line, forwards, BYTES_FORWARD_TRIE, 1)
+                last = find_digit(line, reversed(forwards), BYTES_BACKWARD_TRIE, -1)
+                sum_stage2 += int(first + last)
+    return (sum_stage1, sum_stage2)
+
+def calibrate_file(path: str, workers: int | None = None) -> tuple:
+    """Stage1 and stage2 sums for a (huge) local calibration file, split
+    across a pool of worker processes"""
+    workers = workers or os.cpu_count()
+    ranges = split_file(path, workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        starts, ends = zip(*ranges) if ranges else ((), ())
+        partials = list(executor.map(calibrate_range, [path] * len(ranges), starts, ends))
+    return (sum(p[0] for p in partials), sum(p[1] for p in partials))
+
+
+def stage1_test():
+    sum = 0
+    for line in TEST.split():
+        sum += get_calibration_value_stage1(line)
+    print(f"Sum of all calibration_values (stage1 example) = {sum}")
 
+def stage1():
     sum = 0
-    for line in input.split():
-        calibration_value = get_calibration_value_stage1(line)
-        sum += calibration_value
+    for line in read_url(URL).split():
+        sum += get_calibration_value_stage1(line)
     print(f"Sum of all calibration_values (stage1) = {sum}")
 
+def stage2_test():
     sum = 0
-    for line in input.split():
-        calibration_value = get_calibration_value_stage2(line)
-        sum += calibration_value
+    for line in TEST_STAGE2.split():
+        sum += get_calibration_value_scan(line)
+    print(f"Sum of all calibration_values (stage2 example) = {sum}")
+
+def stage2():
+    sum = 0
+    for line in read_url(URL).split():
+        sum += get_calibration_value_scan(line)
     print(f"Sum of all calibration_values (stage2) = {sum}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", help="a local calibration file to sum instead")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes for --file")
+    args = parser.parse_args()
+
+    if args.file:
+        sum_stage1, sum_stage2 = calibrate_file(args.file, args.workers)
+        print(f"Sum of all calibration_values (stage1) = {sum_stage1}")
+        print(f"Sum of all calibration_values (stage2) = {sum_stage2}")
+    else:
+        stage1_test()
+        stage1()
+        stage2_test()
+        stage2()
@@ -1,10 +1,15 @@
 #!/usr/bin/env python3
-import requests
+from helpers import read_url as read_url
+from parsing import lines
+from array import array
+from functools import lru_cache
+import numpy as np
+import re
 
-# Session cookie is valid for 10 years!
-COOKIEFILE = ".session_cookie"
 URL = "https://adventofcode.com/2023/day/2/input"
 MAXIMUMS = {"red": 12, "green": 13, "blue": 14}
+COLOURS = ("red", "green", "blue")
+CUBES_RE = re.compile(r"(\d+) (red|green|blue)")
 TEST = """Game 1: 3 blue, 4 red; 1 red, 2 green, 6 blue; 2 green
 Game 2: 1 blue, 2 green; 3 green, 4 blue, 1 red; 1 green, 1 blue
 Game 3: 8 green, 6 blue, 20 red; 5 blue, 4 red, 13 green; 5 green, 1 red
@@ -13,19 +18,6 @@ Game 5: 6 red, 1 blue, 3 green; 2 blue, 1 red, 2 green
 """
 
 
-def read_cookie(file: str) -> str:
-    """Get the AdventOfCode session cookie we saved earlier"""
-    with open(file, mode="r") as f:
-        return f.read().strip()
-
-
-def read_url(url: str) -> str:
-    """Get the unmolested data from a URL"""
-    session_cookie = {"session": read_cookie(COOKIEFILE)}
-    with requests.get(url=url, timeout=5, cookies=session_cookie) as content:
-        return content.text
-
-
 def is_cube_set_possible(cubes: dict) -> bool:
     """Return true if all cube values are less than maximums"""
     if (
@@ -89,11 +81,120 @@ def solve(input: str) -> dict:
     return {"possible": sum_possible, "powers": sum_powers}
 
 
-if __name__ == "__main__":
-    puzzle_input = read_url(URL)
+def parse_games(input: str) -> dict:
+    """Parse every game once, into columns of game ID and the most cubes
+    of each colour seen in any of its sets"""
+    games = {column: array("q") for column in ("id",) + COLOURS}
+    for line in lines(input):
+        game, _, cube_sets = line.partition(":")
+        most = dict.fromkeys(COLOURS, 0)
+        for n, colour in CUBES_RE.findall(cube_sets):
+            n = int(n)
+            if n > most[colour]:
+                most[colour] = n
+        games["id"].append(int(game.split()[-1]))
+        for colour in COLOURS:
+            games[colour].append(most[colour])
+    return games
+
+
+# stage1 and stage2 both ask for the same input, only parse it once per URL
+@lru_cache(maxsize=None)
+def _cached_games(url: str) -> dict:
+    return parse_games(read_url(url))
+
+
+def load_games(url: str) -> dict:
+    """The parsed games of a URL's input, each caller gets its own copy of
+    the columns so none can change another's"""
+    return {column: array("q", values) for column, values in _cached_games(url).items()}
+
+
+def solve_games(games: dict, maximums: dict = MAXIMUMS) -> dict:
+    """Return both, from the parsed games;
+    - the sum of game IDs where all game sets are possible
+    - the sum of min powers
+    """
+    sum_possible = 0
+    sum_powers = 0
+    for id, red, green, blue in zip(*(games[c] for c in ("id",) + COLOURS)):
+        if (
+            red <= maximums["red"]
+            and green <= maximums["green"]
+            and blue <= maximums["blue"]
+        ):
+            sum_possible += id
+        sum_powers += red * green * blue
+    return {"possible": sum_possible, "powers": sum_powers}
 
-    print(f"Sum of game IDs for TEST input: {solve(TEST)['possible']}")
-    print(f"Sum of min powers for TEST input: {solve(TEST)['powers']}")
-    print()
-    print(f"Sum of game IDs for puzzle input: {solve(puzzle_input)['possible']}")
-    print(f"Sum of min powers for puzzle input: {solve(puzzle_input)['powers']}")
+
+def build_limit_index(games: dict) -> dict:
+    """Running totals of game IDs, and of games, possible under every
+    (red, green, blue) limit, over the distinct cube counts of each colour"""
+    ids = np.asarray(games["id"], dtype=np.int64)
+    axes = [np.unique(np.asarray(games[c], dtype=np.int64)) for c in COLOURS]
+    cells = tuple(np.searchsorted(a, games[c]) for a, c in zip(axes, COLOURS))
+    sums = np.zeros(tuple(len(a) for a in axes), dtype=np.int64)
+    counts = np.zeros_like(sums)
+    np.add.at(sums, cells, ids)
+    np.add.at(counts, cells, 1)
+    for axis in range(len(COLOURS)):
+        sums = sums.cumsum(axis=axis)
+        counts = counts.cumsum(axis=axis)
+    return {"axes": axes, "sums": sums, "counts": counts}
+
+
+def query_limits(index: dict, limits) -> tuple:
+    """Sum and count of possible game IDs for each (red, green, blue) row
+    of limits, all answered at once"""
+    limits = np.atleast_2d(np.asarray(limits, dtype=np.int64))
+    found = np.ones(len(limits), dtype=bool)
+    cells = list()
+    for n, axis in enumerate(index["axes"]):
+        # The largest cube count seen that is still within the limit
+        cell = np.searchsorted(axis, limits[:, n], side="right") - 1
+        found &= cell >= 0
+        cells.append(np.maximum(cell, 0))
+    if not found.any():
+        # Includes having no games at all, nothing to look up
+        return (np.zeros(len(limits), np.int64), np.zeros(len(limits), np.int64))
+    cells = tuple(cells)
+    return (
+        np.where(found, index["sums"][cells], 0),
+        np.where(found, index["counts"][cells], 0),
+    )
+
+
+def possible_games(index: dict, maximums: dict = MAXIMUMS) -> dict:
+    """Sum and count of game IDs possible under a single set of maximums"""
+    sums, counts = query_limits(index, [[maximums[c] for c in COLOURS]])
+    return {"possible": int(sums[0]), "count": int(counts[0])}
+
+
+def stage1_test():
+    games = parse_games(TEST)
+    index = build_limit_index(games)
+    assert possible_games(index)["possible"] == solve_games(games)["possible"]
+    print(f"Sum of game IDs for TEST input: {solve_games(games)['possible']}")
+
+
+def stage1():
+    games = load_games(URL)
+    print(f"Sum of game IDs for puzzle input: {solve_games(games)['possible']}")
+
+
+def stage2_test():
+    games = parse_games(TEST)
+    print(f"Sum of min powers for TEST input: {solve_games(games)['powers']}")
+
+
+def stage2():
+    games = load_games(URL)
+    print(f"Sum of min powers for puzzle input: {solve_games(games)['powers']}")
+
+
+if __name__ == "__main__":
+    stage1_test()
+    stage1()
+    stage2_test()
+    stage2()
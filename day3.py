@@ -1,9 +1,15 @@
 #!/usr/bin/env python3
-import requests
+from helpers import read_url as read_url
+from parsing import DIGITS_BYTES_RE, DIGITS_RE, char_grid, lines
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
 from re import finditer
+import argparse
+import math
+import numpy as np
+import sys
 
-# Session cookie is valid for 10 years!
-COOKIEFILE = ".session_cookie"
 URL = "https://adventofcode.com/2023/day/3/input"
 TEST = """467..114..
 ...*......
@@ -17,19 +23,6 @@ TEST = """467..114..
 .664.598.."""
 
 
-def read_cookie(file: str) -> str:
-    """Get the AdventOfCode session cookie we saved earlier"""
-    with open(file, mode="r") as f:
-        return f.read().strip()
-
-
-def read_url(url: str) -> str:
-    """Get the unmolested data from a URL"""
-    session_cookie = {"session": read_cookie(COOKIEFILE)}
-    with requests.get(url=url, timeout=5, cookies=session_cookie) as content:
-        return content.text
-
-
 def create_map(schematic: str) -> tuple:
     """Parse the schematic and return a tuple of :
     - parts locations
@@ -161,23 +154,215 @@ def sum_gear_ratios(parts_map, symbols_map) -> int:
     return sum(gear_ratios)
 
 
-if __name__ == "__main__":
+def create_grid(schematic: str) -> np.ndarray:
+    """Load the schematic as a 2D grid of character codes"""
+    # Pad any short lines with '.' so the grid is rectangular
+    return char_grid(schematic, fill=".")
+
+
+def touches_symbol(grid: np.ndarray) -> np.ndarray:
+    """Boolean mask of every cell next to (or on) a symbol"""
+    digits = (grid >= ord("0")) & (grid <= ord("9"))
+    symbols = ~digits & (grid != ord("."))
+    # Dilate the symbols by one cell in every direction
+    padded = np.pad(symbols, 1)
+    height, width = grid.shape
+    mask = np.zeros_like(symbols)
+    for dy in range(3):
+        for dx in range(3):
+            mask |= padded[dy : dy + height, dx : dx + width]
+    return mask
+
+
+def grid_parts(grid: np.ndarray) -> dict:
+    """Find every number in the grid at once, as columns of part number,
+    row, start and end, plus a grid of labels holding each digit's part
+    index (-1 everywhere else)"""
+    height, width = grid.shape
+    # A non-digit column on the right stops numbers running onto the next row
+    padded = np.pad(grid, ((0, 0), (0, 1)), constant_values=ord(".")).ravel()
+    cells = np.flatnonzero((padded >= ord("0")) & (padded <= ord("9")))
+    first = np.ones(len(cells), dtype=bool)
+    first[1:] = np.diff(cells) != 1
+    # Part index of each digit cell, and where each part starts in cells
+    ids = np.cumsum(first) - 1
+    offsets = np.flatnonzero(first)
+    lengths = np.diff(np.append(offsets, len(cells)))
+    labels = np.full(len(padded), -1, dtype=np.int64)
+    labels[cells] = ids
+    number = np.zeros(0, dtype=np.int64)
+    if len(cells):
+        # Each digit times its place value, summed per part
+        place = lengths[ids] - 1 - (np.arange(len(cells)) - offsets[ids])
+        digits = (padded[cells] - ord("0")).astype(np.int64)
+        number = np.add.reduceat(digits * 10**place, offsets)
+    return {
+        "number": number,
+        "row": cells[offsets] // (width + 1),
+        "start": cells[offsets] % (width + 1),
+        "end": cells[offsets] % (width + 1) + lengths,
+        "labels": labels.reshape(height, width + 1)[:, :width],
+        # Where each part's digits start in cells, for reduceat over them
+        "offsets": offsets,
+        "cells": cells,
+    }
 
-    def example():
-        test_parts_map, test_symbols_map = create_map(TEST)
-        example_parts_sum = sum_good_parts(test_parts_map, test_symbols_map)
-        print(f"Sum of good engine parts (example): {example_parts_sum}")
 
-        example_gear_sum = sum_gear_ratios(test_parts_map, test_symbols_map)
-        print(f"Sum of all gear ratios (example): {example_gear_sum}")
+def gear_index(grid: np.ndarray, parts: dict) -> np.ndarray:
+    """The distinct part indexes around each '*', one row per star, padded
+    with -1"""
+    labels = np.pad(parts["labels"], 1, constant_values=-1)
+    ys, xs = np.nonzero(grid == ord("*"))
+    # The 3x3 neighbourhood of every star at once, in padded coordinates
+    around = np.stack(
+        [labels[ys + dy, xs + dx] for dy in range(3) for dx in range(3)], axis=1
+    )
+    around.sort(axis=1)
+    # A part of several digits shows up once per digit, keep the first
+    around[:, 1:][around[:, 1:] == around[:, :-1]] = -1
+    return around
 
-    def puzzle():
-        parts_map, symbols_map = create_map(read_url(URL))
-        parts_sum = sum_good_parts(parts_map, symbols_map)
-        print(f"Sum of good engine parts (puzzle): {parts_sum}")
 
-        gear_sum = sum_gear_ratios(parts_map, symbols_map)
-        print(f"Sum of all gear ratios (puzzle): {gear_sum}")
+def sum_good_parts_grid(grid: np.ndarray, parts: dict | None = None) -> int:
+    """Sum the parts touching a symbol, one reduction over all digits"""
+    if parts is None:
+        parts = grid_parts(grid)
+    if not len(parts["cells"]):
+        return 0
+    touches = np.pad(touches_symbol(grid), ((0, 0), (0, 1))).ravel()
+    good = np.logical_or.reduceat(touches[parts["cells"]], parts["offsets"])
+    return int(parts["number"][good].sum())
+
+
+def sum_gear_ratios_grid(grid: np.ndarray, parts: dict | None = None) -> int:
+    """Sum the ratios of each '*' with two or more adjacent parts"""
+    if parts is None:
+        parts = grid_parts(grid)
+    if not len(parts["number"]):
+        return 0
+    around = gear_index(grid, parts)
+    found = around >= 0
+    gears = found.sum(axis=1) >= 2
+    numbers = np.where(found, parts["number"][np.maximum(around, 0)], 1)
+    return int(numbers[gears].prod(axis=1).sum())
+
+
+# stage1 and stage2 both use the same schematic, only find its parts once per URL
+@lru_cache(maxsize=None)
+def load_schematic(url: str) -> tuple:
+    grid = create_grid(read_url(url))
+    parts = grid_parts(grid)
+    # Shared between the stages, so none can change another's
+    for column in parts.values():
+        column.flags.writeable = False
+    return (grid, parts)
+
+
+def scan_row(line: str) -> tuple:
+    """Parse one schematic row into:
+    - parts as (part number, start, end)
+    - the start of each part, for bisecting
+    - running count of symbols, so symbols in line[a:b] is count[b] - count[a]
+    - '*' locations
+    """
+    line = line.rstrip("\n")
+    parts = [(int(p.group()), p.start(), p.end()) for p in DIGITS_RE.finditer(line)]
+    starts = [p[1] for p in parts]
+    symbol_count = list(accumulate((c not in "0123456789." for c in line), initial=0))
+    # Stars are sparse, str.find skips between them faster than a regex
+    stars = list()
+    star = line.find("*")
+    while star >= 0:
+        stars.append(star)
+        star = line.find("*", star + 1)
+    return (parts, starts, symbol_count, stars)
+
+
+def row_contributions(rows: list, row: tuple):
+    """Yield ('part', number) and ('gear', ratio) for one row, given the"""
+    """rows around it (including itself)"""
+    parts, _, _, stars = row
+    for number, start, end in parts:
+        for _, _, count, _ in rows:
+            width = len(count) - 1
+            if count[min(end + 1, width)] - count[min(max(start - 1, 0), width)]:
+                yield ("part", number)
+                break
+    for star in stars:
+        adjacent = list()
+        for row_parts, row_starts, _, _ in rows:
+            # Only the last two parts starting before star + 1 can reach it
+            i = bisect_right(row_starts, star + 1)
+            for number, _, end in row_parts[max(i - 2, 0) : i]:
+                if end >= star:
+                    adjacent.append(number)
+        if len(adjacent) >= 2:
+            yield ("gear", math.prod(adjacent))
+
+
+def stream_schematic(source):
+    """Yield part and gear contributions from an iterable of rows, eg. an"""
+    """open file, only ever holding the previous, current and next rows"""
+    previous, current = None, None
+    for line in lines(source):
+        following = scan_row(line)
+        if current:
+            rows = [r for r in (previous, current, following) if r]
+            yield from row_contributions(rows, current)
+        previous, current = current, following
+    if current:
+        rows = [r for r in (previous, current) if r]
+        yield from row_contributions(rows, current)
+
+
+def sum_schematic_stream(source) -> tuple:
+    """Return the sum of good parts and of gear ratios, streaming the rows"""
+    parts_sum = 0
+    gear_sum = 0
+    for kind, value in stream_schematic(source):
+        if kind == "part":
+            parts_sum += value
+        else:
+            gear_sum += value
+    return (parts_sum, gear_sum)
+
+
+def stage1_test():
+    example_parts_sum = sum_good_parts_grid(create_grid(TEST))
+    print(f"Sum of good engine parts (example): {example_parts_sum}")
+
+
+def stage1():
+    parts_sum = sum_good_parts_grid(*load_schematic(URL))
+    print(f"Sum of good engine parts (puzzle): {parts_sum}")
+
+
+def stage2_test():
+    example_gear_sum = sum_gear_ratios_grid(create_grid(TEST))
+    print(f"Sum of all gear ratios (example): {example_gear_sum}")
+
+
+def stage2():
+    gear_sum = sum_gear_ratios_grid(*load_schematic(URL))
+    print(f"Sum of all gear ratios (puzzle): {gear_sum}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--stream",
+        metavar="FILE",
+        help="stream a schematic from FILE ('-' for stdin) instead",
+    )
+    args = parser.parse_args()
 
-    example()
-    puzzle()
+    if args.stream:
+        with open(args.stream) if args.stream != "-" else sys.stdin as f:
+            parts_sum, gear_sum = sum_schematic_stream(f)
+        print(f"Sum of good engine parts ({args.stream}): {parts_sum}")
+        print(f"Sum of all gear ratios ({args.stream}): {gear_sum}")
+    else:
+        stage1_test()
+        stage1()
+        stage2_test()
+        stage2()
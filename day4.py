@@ -1,9 +1,8 @@
 #!/usr/bin/env python3
-import requests
+from helpers import read_url as read_url
+from parsing import lines
 from collections import deque
 
-# Session cookie is valid for 10 years!
-COOKIEFILE = ".session_cookie"
 URL = "https://adventofcode.com/2023/day/4/input"
 TEST = """Card 1: 41 48 83 86 17 | 83 86  6 31 17  9 48 53
 Card 2: 13 32 20 16 61 | 61 30 68 82 17 32 24 19
@@ -13,19 +12,6 @@ Card 5: 87 83 26 28 32 | 88 30 70 12 93 22 82 36
 Card 6: 31 18 13 56 72 | 74 77 10 23 35 67 36 11"""
 
 
-def read_cookie(file: str) -> str:
-    """Get the AdventOfCode session cookie we saved earlier"""
-    with open(file, mode="r") as f:
-        return f.read().strip()
-
-
-def read_url(url: str) -> str:
-    """Get the unmolested data from a URL"""
-    session_cookie = {"session": read_cookie(COOKIEFILE)}
-    with requests.get(url=url, timeout=5, cookies=session_cookie) as content:
-        return content.text
-
-
 def phase1(input: str) -> int:
     scratchcards = list()
     for line in input.strip().split("\n"):
@@ -74,8 +60,61 @@ def phase2(input: str) -> int:
 
     return card_tally
 
+
+def card_matches(line: str) -> int:
+    """How many of the chosen numbers on a card are winning numbers"""
+    _, _, info = line.partition(":")
+    winning, _, chosen = info.partition("|")
+    return len(set(winning.split()).intersection(chosen.split()))
+
+
+def phase1_linear(input) -> int:
+    """Sum the points of every card, doubling for each match after the first"""
+    """Takes the puzzle string or any iterable of lines, eg. an open file"""
+    points = 0
+    for line in lines(input):
+        matches = card_matches(line)
+        if matches:
+            points += 1 << (matches - 1)
+    return points
+
+
+def phase2_linear(input) -> int:
+    """Tally every card and copy in one forward pass, no queue of copies"""
+    """Takes the puzzle string or any iterable of lines, eg. an open file"""
+    # extra[i] is how many copies have been won of the i'th card after this one
+    extra: deque = deque()
+    card_tally = 0
+    for line in lines(input):
+        copies = 1 + (extra.popleft() if extra else 0)
+        card_tally += copies
+        matches = card_matches(line)
+        while len(extra) < matches:
+            extra.append(0)
+        for i in range(matches):
+            extra[i] += copies
+    return card_tally
+
+
+def stage1_test():
+    assert phase1_linear(TEST) == phase1(TEST)
+    print(f"Phase1 (example) : {phase1_linear(TEST)}")
+
+
+def stage1():
+    print(f"Phase1           : {phase1_linear(read_url(URL))}")
+
+
+def stage2_test():
+    print(f"Phase2 (example) : {phase2_linear(TEST)}")
+
+
+def stage2():
+    print(f"Phase2           : {phase2_linear(read_url(URL))}")
+
+
 if __name__ == "__main__":
-    print(f"Phase1 (example) : {phase1(TEST)}")
-    print(f"Phase1           : {phase1(read_url(URL))}")
-    print(f"Phase2 (example) : {phase2(TEST)}")
-    print(f"Phase2           : {phase2(read_url(URL))}")
+    stage1_test()
+    stage1()
+    stage2_test()
+    stage2()
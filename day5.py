@@ -1,6 +1,14 @@
 #!/usr/bin/env python3
 from helpers import timethis as timethis, read_url as read_url
-import re
+from parsing import ints, lines
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from time import perf_counter
+import argparse
+import numpy as np
+import os
 
 URL = "https://adventofcode.com/2023/day/5/input"
 TEST = """seeds: 79 14 55 13
@@ -37,162 +45,393 @@ humidity-to-location map:
 60 56 37
 56 93 4"""
 
+# The order we walk the maps from seed to location
+MAPS = (
+    "seed-to-soil",
+    "soil-to-fertilizer",
+    "fertilizer-to-water",
+    "water-to-light",
+    "light-to-temperature",
+    "temperature-to-humidity",
+    "humidity-to-location",
+)
+# Seeds per NumPy batch when sweeping seed ranges, bounds the memory used
+CHUNK_SIZE = 1 << 20
+# Minimum seconds between progress reports from the stage2 sweep
+PROGRESS_SECONDS = 5.0
 
-def read_almanac_stage1(input: str) -> dict:
-    """Take the input string and build a dict of seeds and maps"""
-    """Refactored for speed and efficiency"""
-    almanac = dict()
-    map_token = None
-    for line in input.strip().split("\n"):
-        if re.match("^$", line):
-            # Clear the map token if we encounter a blank line
-            map_token = None
-        elif re.findall("seeds:", line):
-            # The list of seeds
-            almanac["seeds"] = line.strip().split()[1:]
-        elif re.findall("map:", line):
-            # A map token
-            map_token = line.split()[0]
-            almanac[map_token] = list()
-        elif map_token and re.findall("^[0-9]", line):
-            # We must be reading mapping data, so add to the list of ranges
-            map_data = line.split()
-            almanac[map_token].append(decode_map(map_data))
+
+class Almanac:
+    """Seeds and maps from the almanac. Each map is held as columns of
+    source start, length and offset (destination - source), in file order"""
+
+    __slots__ = ("seeds", "maps", "tables")
+
+    def __init__(self) -> None:
+        self.seeds = array("q")
+        # map name -> (starts, lengths, offsets)
+        self.maps: dict = dict()
+        # Compiled lookup tables, built on first use by compile_almanac
+        self.tables: dict | None = None
+
+    @property
+    def seed_ranges(self) -> list:
+        """The seeds read as (start, length) pairs, as [start, end) ranges"""
+        pairs = iter(self.seeds)
+        return [(start, start + length) for start, length in zip(pairs, pairs)]
+
+
+def read_almanac(input) -> Almanac:
+    """Take the input string, or an open file, and build the almanac in a"""
+    """single pass"""
+    almanac = Almanac()
+    columns = None
+    for line in lines(input):
+        if line[0].isdigit():
+            if columns is None:
+                print(f"ranges outside of a map: {line}")
+                continue
+            dst_start, src_start, length = map(int, line.split())
+            columns[0].append(src_start)
+            columns[1].append(length)
+            columns[2].append(dst_start - src_start)
+        elif line.startswith("seeds:"):
+            almanac.seeds.extend(ints(line))
+        elif line.rstrip().endswith("map:"):
+            columns = (array("q"), array("q"), array("q"))
+            almanac.maps[line.split()[0]] = columns
         else:
             print(f"unknown line type: {line}")
     return almanac
 
 
-def decode_map(ranges: list) -> dict:
-    """Returns dict of source to destination [start, end] mappings"""
-    dst_start, src_start, range_length = ranges
-    return {
-        "src": [int(src_start), int(src_start) + int(range_length)],
-        "dst": [int(dst_start), int(dst_start) + int(range_length)],
-    }
-
-
-def read_almanac_stage2(input: str) -> dict:
-    """Take the input string and build a dict of seeds and maps"""
-    """Refactored for speed and efficiency"""
-    almanac = dict()
-    map_token = None
-    for line in input.strip().split("\n"):
-        if re.match("^$", line):
-            # Clear the map token if we encounter a blank line
-            map_token = None
-        elif re.findall("seeds:", line):
-            # The range of seeds
-            almanac["seeds"] = list()
-            all_seeds = iter(line.strip().split()[1:])
-            for x in all_seeds:
-                almanac["seeds"].append([x, next(all_seeds)])
-        elif re.findall("map:", line):
-            # A map token
-            map_token = line.split()[0]
-            almanac[map_token] = list()
-        elif map_token and re.findall("^[0-9]", line):
-            # We must be reading mapping data, so add to the list of ranges
-            map_data = line.split()
-            almanac[map_token].append(decode_map(map_data))
+def compile_map(columns: tuple) -> tuple:
+    """Compile a map's columns into parallel lists of source starts, source"""
+    """ends and offsets, sorted by start, ready for binary search"""
+    starts, lengths, offsets = columns
+    ranges = sorted(
+        (start, start + length, offset)
+        for start, length, offset in zip(starts, lengths, offsets)
+    )
+    starts = [r[0] for r in ranges]
+    ends = [r[1] for r in ranges]
+    offsets = [r[2] for r in ranges]
+    return (starts, ends, offsets)
+
+
+def split_intervals(table: tuple, intervals: list) -> list:
+    """Split [start, end) intervals at the boundaries of a compiled map"""
+    """Returns (start, end, offset) pieces, unmapped gaps have offset 0"""
+    starts, ends, offsets = table
+    pieces = list()
+    for start, end in intervals:
+        # Begin at the last range starting at or before start, it may overlap
+        i = max(bisect_right(starts, start) - 1, 0)
+        while i < len(starts) and starts[i] < end:
+            if ends[i] > start:
+                if start < starts[i]:
+                    # The gap before this mapping range maps to itself
+                    pieces.append((start, starts[i], 0))
+                    start = starts[i]
+                overlap_end = min(end, ends[i])
+                pieces.append((start, overlap_end, offsets[i]))
+                start = overlap_end
+            i += 1
+        if start < end:
+            pieces.append((start, end, 0))
+    return pieces
+
+
+def compose_maps(tables: list) -> tuple:
+    """Compose compiled maps, in order, into a single compiled map"""
+    # Beyond the furthest range end every map is the identity
+    limit = max((max(t[1]) for t in tables if t[1]), default=0)
+    # (source start, source end, offset so far)
+    segments = [(0, limit, 0)]
+    for table in tables:
+        composed = list()
+        for start, end, offset in segments:
+            image = [(start + offset, end + offset)]
+            for lo, hi, step in split_intervals(table, image):
+                composed.append((lo - offset, hi - offset, offset + step))
+        segments = composed
+    ranges = list()
+    for start, end, offset in segments:
+        if offset == 0:
+            # Identity is the default for a compiled map, don't store it
+            continue
+        if ranges and ranges[-1][1] == start and ranges[-1][2] == offset:
+            # Coalesce neighbours with the same offset
+            ranges[-1] = (ranges[-1][0], end, offset)
         else:
-            print(f"unknown line type: {line}")
+            ranges.append((start, end, offset))
+    return ([r[0] for r in ranges], [r[1] for r in ranges], [r[2] for r in ranges])
 
-    return almanac
+
+def compile_almanac(almanac: Almanac) -> dict:
+    """Compile each map, plus the composed seed-to-location map, once"""
+    if almanac.tables is None:
+        tables = {map: compile_map(almanac.maps[map]) for map in MAPS}
+        tables["seed-to-location"] = compose_maps([tables[map] for map in MAPS])
+        almanac.tables = tables
+    return almanac.tables
+
+
+def lookup(table: tuple, source: int) -> int:
+    """Binary search a compiled map, or return source if not mapped"""
+    starts, ends, offsets = table
+    i = bisect_right(starts, source) - 1
+    if i >= 0 and source < ends[i]:
+        return source + offsets[i]
+    return source
 
 
 # Very hot path
-def get_mapping(almanac: dict, source: int, map: str) -> int:
+def get_mapping(almanac: Almanac, source: int, map: str) -> int:
     """Return the mapping if found, or source if not"""
-    # mapping['src|dst'] = [ start, end ]
-    for mapping in almanac[map]:
-        if source >= mapping["src"][0] and source <= mapping["src"][1]:
-            return mapping["dst"][0] + source - mapping["src"][0]
-    # If no match, then destination is source
-    return source
+    return lookup(compile_almanac(almanac)[map], source)
 
 
 # Very hot path
-def seed_to_location(almanac: dict, seed: int) -> int:
-    """Walk the maps from seed and return the location"""
-    soil = get_mapping(almanac, seed, "seed-to-soil")
-    fertilizer = get_mapping(almanac, soil, "soil-to-fertilizer")
-    water = get_mapping(almanac, fertilizer, "fertilizer-to-water")
-    light = get_mapping(almanac, water, "water-to-light")
-    temperature = get_mapping(almanac, light, "light-to-temperature")
-    humidity = get_mapping(almanac, temperature, "temperature-to-humidity")
-    return get_mapping(almanac, humidity, "humidity-to-location")
+def seed_to_location(almanac: Almanac, seed: int) -> int:
+    """Resolve the seed to a location with a single search of the composed maps"""
+    return lookup(compile_almanac(almanac)["seed-to-location"], seed)
 
 
-if __name__ == "__main__":
+def lookup_batch(table: tuple, sources: np.ndarray) -> np.ndarray:
+    """Binary search a compiled map for a whole array of sources at once"""
+    starts, ends, offsets = (np.asarray(c, dtype=np.int64) for c in table)
+    if len(starts) == 0:
+        return sources.copy()
+    i = np.searchsorted(starts, sources, side="right") - 1
+    # Index 0 stands in for 'no range', the mask below throws it away
+    found = np.maximum(i, 0)
+    inside = (i >= 0) & (sources < ends[found])
+    return sources + np.where(inside, offsets[found], 0)
 
-    def stage1_test():
-        almanac = read_almanac_stage1(TEST)
-        lowest_location = min(
-            [seed_to_location(almanac, int(x)) for x in almanac["seeds"]]
-        )
-        print(f"{'Stage1 example':16} : {lowest_location}")
 
-    def stage1():
-        almanac = read_almanac_stage1(read_url(URL))
-        lowest_location = min(
-            [seed_to_location(almanac, int(x)) for x in almanac["seeds"]]
+def seeds_to_locations(almanac: Almanac, seeds: np.ndarray) -> np.ndarray:
+    """Resolve an array of seeds to an array of locations"""
+    return lookup_batch(compile_almanac(almanac)["seed-to-location"], seeds)
+
+
+def seed_chunks(almanac: Almanac, chunk_size: int = CHUNK_SIZE) -> list:
+    """Split every seed range into [start, end) chunks of at most chunk_size"""
+    chunks = list()
+    for start, end in almanac.seed_ranges:
+        for chunk_start in range(start, end, chunk_size):
+            chunks.append((chunk_start, min(chunk_start + chunk_size, end)))
+    return chunks
+
+
+def lowest_location_in_chunk(almanac: Almanac, chunk: tuple) -> int:
+    """Evaluate every seed in a [start, end) chunk and return the lowest location"""
+    seeds = np.arange(chunk[0], chunk[1], dtype=np.int64)
+    return int(seeds_to_locations(almanac, seeds).min())
+
+
+# Each worker process keeps its own copy of the almanac, sent once at startup
+_worker_almanac: Almanac = Almanac()
+
+
+def _init_worker(almanac: Almanac) -> None:
+    global _worker_almanac
+    _worker_almanac = almanac
+    compile_almanac(_worker_almanac)
+
+
+def _worker_lowest_location(chunk: tuple) -> int:
+    return lowest_location_in_chunk(_worker_almanac, chunk)
+
+
+def lowest_location_sweep(
+    almanac: Almanac,
+    chunk_size: int = CHUNK_SIZE,
+    workers: int | None = None,
+    progress_every: float = PROGRESS_SECONDS,
+) -> int:
+    """Evaluate every seed of every seed range, a chunk at a time, spread"""
+    """over a pool of worker processes (all cores by default)"""
+    chunks = seed_chunks(almanac, chunk_size)
+    total = sum(end - start for start, end in chunks)
+    if workers == 1:
+        executor = None
+        results = map(partial(lowest_location_in_chunk, almanac), chunks)
+    else:
+        executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(almanac,)
         )
-        print(f"{'Stage1':16} : {lowest_location}")
-
-    def stage2_test():
-        """A small test range, lets do it in one"""
-        almanac = read_almanac_stage2(TEST)
-        large_range = list()
-        for pair in almanac["seeds"]:
-            large_range.extend(list(range(int(pair[0]), int(pair[0]) + int(pair[1]))))
-        lowest_location = min([seed_to_location(almanac, int(x)) for x in large_range])
-        print(f"{'Stage2 example':16} : {lowest_location}")
-
-    @timethis
-    def stage2():
-        """A huge test range, iterate over seed pairs to see progress"""
-        almanac = read_almanac_stage2(read_url(URL))
-
-        def _optimise_almanac_ranges(_almanac) -> dict:
-            """To avoid iterating over many mapping ranges in a very"""
-            """hot part of the code, we notice the actual puzzle ranges"""
-            """are contiguous so we can coalesce them into a single range"""
-            for map_token in _almanac:
-                if map_token == "seeds":
-                    # skip this non-map key
-                    continue
-                src_range_list = list()
-                dst_range_list = list()
-                for ranges in _almanac[map_token]:
-                    src_range_list.append((ranges["src"][0], ranges["src"][1]))
-                src_min = min(src_range_list)[0]
-                src_max = max(src_range_list)[1]
-                for ranges in _almanac[map_token]:
-                    dst_range_list.append((ranges["dst"][0], ranges["dst"][1]))
-                dst_min = min(dst_range_list)[0]
-                dst_max = max(dst_range_list)[1]
-                _almanac[map_token] = [
-                    {
-                        "src": [src_min, src_max],
-                        "dst": [dst_min, dst_max],
-                    }
-                ]
-            return _almanac
-
-        almanac = _optimise_almanac_ranges(almanac)
-
-        location = 99999999999
-        for pair in almanac["seeds"]:
-            print(f"Checking seed pairs : {pair}", flush=True)
-            for seed in range(int(pair[0]), int(pair[0]) + int(pair[1])):
-                new_location = seed_to_location(almanac, seed)
-                if new_location < location:
-                    print(f" - new lowest location: {new_location}", flush=True)
-                    location = new_location
-        print(f"{'Stage2':16} : {location}")
+        results = executor.map(_worker_lowest_location, chunks)
+
+    location = None
+    checked = 0
+    last_report = perf_counter()
+    try:
+        for chunk, lowest in zip(chunks, results):
+            checked += chunk[1] - chunk[0]
+            if location is None or lowest < location:
+                location = lowest
+            # Only report progress every so often, printing is not free
+            if perf_counter() - last_report >= progress_every:
+                print(
+                    f"Checked {checked}/{total} seeds ({checked / total:.1%}),"
+                    f" lowest location so far: {location}",
+                    flush=True,
+                )
+                last_report = perf_counter()
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+    return location
+
+
+def map_intervals(almanac: Almanac, intervals: list, map: str) -> list:
+    """Push [start, end) intervals through a map, splitting them wherever"""
+    """they cross a mapping range boundary. Unmapped parts pass through."""
+    table = compile_almanac(almanac)[map]
+    return [
+        (start + offset, end + offset)
+        for start, end, offset in split_intervals(table, intervals)
+    ]
+
+
+def lowest_location_ranges(almanac: Almanac) -> int:
+    """Walk whole seed ranges through the maps and return the lowest location"""
+    intervals = almanac.seed_ranges
+    for map in MAPS:
+        intervals = map_intervals(almanac, intervals, map)
+    return min(start for start, _ in intervals)
+
+
+def seed_index(almanac: Almanac) -> tuple:
+    """Sort and merge the seed ranges into parallel lists of starts and ends"""
+    starts = list()
+    ends = list()
+    for start, end in sorted(almanac.seed_ranges):
+        if ends and start <= ends[-1]:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return (starts, ends)
+
+
+def first_seed(index: tuple, start: int, end: int) -> int | None:
+    """The lowest seed in [start, end) that is inside a seed range, if any"""
+    starts, ends = index
+    i = bisect_right(starts, start) - 1
+    if i >= 0 and start < ends[i]:
+        return start
+    # Jump straight to the next seed range
+    if i + 1 < len(starts) and starts[i + 1] < end:
+        return starts[i + 1]
+    return None
+
+
+def invert_table(table: tuple, top: int) -> list:
+    """Invert a compiled map over [0, top) into (location start, location end,"""
+    """offset back to the seed) pieces, sorted by location. The gaps between"""
+    """the stored ranges map to themselves, so they are pieces too."""
+    pieces = list()
+    previous = 0
+    for start, end, offset in zip(*table):
+        if previous < start:
+            pieces.append((previous, start, 0))
+        pieces.append((start + offset, end + offset, -offset))
+        previous = end
+    if previous < top:
+        pieces.append((previous, top, 0))
+    return sorted(pieces)
+
+
+def lowest_location_reverse(almanac: Almanac) -> int | None:
+    """Search the location space upwards from 0 through the inverted maps."""
+    """Each piece of the inverse has a single offset, so jump to the lowest"""
+    """location in it whose seed is in a seed range. Maps need not be one to"""
+    """one, so pieces can overlap, stop once they all start past the best."""
+    index = seed_index(almanac)
+    if not index[0]:
+        return None
+    table = compile_almanac(almanac)["seed-to-location"]
+    top = max(index[1][-1], table[1][-1] if table[1] else 0)
+    location = None
+    for start, end, offset in invert_table(table, top):
+        if location is not None and start >= location:
+            break
+        seed = first_seed(index, start + offset, end + offset)
+        if seed is not None and (location is None or seed - offset < location):
+            location = seed - offset
+    return location
+
+
+def stage1_test():
+    almanac = read_almanac(TEST)
+    seeds = np.array(almanac.seeds, dtype=np.int64)
+    lowest_location = int(seeds_to_locations(almanac, seeds).min())
+    print(f"{'Stage1 example':16} : {lowest_location}")
+
+
+def stage1():
+    almanac = read_almanac(read_url(URL))
+    seeds = np.array(almanac.seeds, dtype=np.int64)
+    lowest_location = int(seeds_to_locations(almanac, seeds).min())
+    print(f"{'Stage1':16} : {lowest_location}")
+
+
+def stage2_test():
+    """A small test range, check the sweep, ranges and reverse search agree"""
+    almanac = read_almanac(TEST)
+    lowest_location = lowest_location_sweep(almanac, workers=1)
+    assert lowest_location == lowest_location_ranges(almanac)
+    assert lowest_location == lowest_location_reverse(almanac)
+    print(f"{'Stage2 example':16} : {lowest_location}")
+
+
+@timethis
+def stage2():
+    """A huge test range, push whole seed ranges through the maps"""
+    almanac = read_almanac(read_url(URL))
+    print(f"{'Stage2':16} : {lowest_location_ranges(almanac)}")
+
+
+@timethis
+def stage2_reverse():
+    """A huge test range, search locations upwards through the inverted maps"""
+    almanac = read_almanac(read_url(URL))
+    print(f"{'Stage2 (reverse)':16} : {lowest_location_reverse(almanac)}")
+
+
+@timethis
+def stage2_sweep(workers: int | None = None):
+    """A huge test range, sweep every seed in chunks to see progress"""
+    almanac = read_almanac(read_url(URL))
+    location = lowest_location_sweep(almanac, workers=workers)
+    print(f"{'Stage2 (sweep)':16} : {location}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sweep", action="store_true", help="also sweep every seed in stage2"
+    )
+    parser.add_argument(
+        "--reverse",
+        action="store_true",
+        help="also search stage2 backwards from the lowest locations",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="worker processes for the stage2 sweep",
+    )
+    args = parser.parse_args()
 
     stage1_test()
     stage1()
     stage2_test()
     stage2()
+    if args.reverse:
+        stage2_reverse()
+    if args.sweep:
+        stage2_sweep(workers=args.workers)
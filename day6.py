@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 from helpers import timethis as timethis, read_url as read_url
+from parsing import ints, lines
 import math
 
 URL = "https://adventofcode.com/2023/day/6/input"
@@ -7,28 +8,27 @@ TEST = """Time:      7  15   30
 Distance:  9  40  200"""
 
 
-def get_races(input: str) -> list:
+def get_races(input) -> list:
     time = list()
     distance = list()
-    for line in input.strip().split("\n"):
-        fields = line.split()
-        if "Time" in fields[0]:
-            time = fields[1:]
-        if "Distance" in fields[0]:
-            distance = fields[1:]
+    for line in lines(input):
+        if line.startswith("Time"):
+            time = ints(line)
+        if line.startswith("Distance"):
+            distance = ints(line)
     races = list(zip(time, distance))
     return races
 
 
-def get_races_stage2(input: str) -> list:
-    time = ""
-    distance = ""
-    for line in input.strip().split("\n"):
-        fields = line.split()
-        if "Time" in fields[0]:
-            time = "".join(fields[1:])
-        if "Distance" in fields[0]:
-            distance = "".join(fields[1:])
+def get_races_stage2(input) -> list:
+    time = 0
+    distance = 0
+    for line in lines(input):
+        # The spaces between the numbers don't count, it's one big race
+        if line.startswith("Time"):
+            time = ints(line.replace(" ", ""))[0]
+        if line.startswith("Distance"):
+            distance = ints(line.replace(" ", ""))[0]
     races = [time, distance]
     return races
 
@@ -67,29 +67,53 @@ def strategies(results: list, record: int):
     return ways
 
 
-if __name__ == "__main__":
+def ways_to_win(race: list) -> int:
+    """Count the hold times that beat the record, without trying each one"""
+    # Holding for h goes h * (time - h), so we need h^2 - time*h + record < 0,
+    # which holds strictly between the roots (time +/- sqrt(time^2 - 4*record)) / 2
+    time = int(race[0])
+    record = int(race[1])
+    discriminant = time * time - 4 * record
+    if discriminant < 0:
+        return 0
+    # isqrt is exact for any size of int, and r <= sqrt(D) < r + 1 puts the
+    # first hold past the lower root at most one step below this guess
+    held = max((time - math.isqrt(discriminant)) // 2 + 1, 0)
+    if held > 0 and (held - 1) * (time - held + 1) > record:
+        held -= 1
+    # Past the middle there's nothing left that wins
+    if held > time - held or held * (time - held) <= record:
+        return 0
+    # The winning hold times are symmetric about time / 2
+    return time - held - held + 1
+
+
+def stage1_test():
+    races = get_races(TEST)
+    ways_to_beat = [ways_to_win(x) for x in races]
+    print(f"{'Stage1 (example)':16} : {math.prod(ways_to_beat)}")
 
-    def stage1_test():
-        races = get_races(TEST)
-        ways_to_beat = [strategies(results(x), int(x[1])) for x in races]
-        print(f"{'Stage1 (example)':16} : {math.prod(ways_to_beat)}")
 
-    def stage1():
-        races = get_races(read_url(URL))
-        ways_to_beat = [strategies(results(x), int(x[1])) for x in races]
-        print(f"{'Stage1':16} : {math.prod(ways_to_beat)}")
+def stage1():
+    races = get_races(read_url(URL))
+    ways_to_beat = [ways_to_win(x) for x in races]
+    print(f"{'Stage1':16} : {math.prod(ways_to_beat)}")
 
-    def stage2_test():
-        races = get_races_stage2(TEST)
-        way_to_beat = strategies(results(races), int(races[1]))
-        print( f"{'Stage2 (example)':16} : {way_to_beat}")
 
-    @timethis
-    def stage2():
-        races = get_races_stage2(read_url(URL))
-        way_to_beat = strategies(results(races), int(races[1]))
-        print( f"{'Stage2':16} : {way_to_beat}")
+def stage2_test():
+    races = get_races_stage2(TEST)
+    way_to_beat = ways_to_win(races)
+    print( f"{'Stage2 (example)':16} : {way_to_beat}")
 
+
+@timethis
+def stage2():
+    races = get_races_stage2(read_url(URL))
+    way_to_beat = ways_to_win(races)
+    print( f"{'Stage2':16} : {way_to_beat}")
+
+
+if __name__ == "__main__":
     stage1_test()
     stage1()
     stage2_test()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Seeded generators of synthetic puzzle inputs, in each day's format"""
+
+from typing import Iterator
+import argparse
+import math
+import random
+import sys
+
+NUMS = ["one", "two", "three", "four", "five", "six", "seven", "eight", "nine"]
+CARDS = "AKQJT98765432"
+MAPS = (
+    "seed-to-soil",
+    "soil-to-fertilizer",
+    "fertilizer-to-water",
+    "water-to-light",
+    "light-to-temperature",
+    "temperature-to-humidity",
+    "humidity-to-location",
+)
+
+
+def generate_day1(rng: random.Random, scale: float = 1.0) -> Iterator[str]:
+    """Calibration lines of letters, digits and embedded digit words"""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    for _ in range(max(int(1000 * scale), 1)):
+        line = list()
+        for _ in range(rng.randint(2, 8)):
+            roll = rng.random()
+            if roll < 0.3:
+                line.append(rng.choice(NUMS))
+            elif roll < 0.5:
+                line.append(str(rng.randint(1, 9)))
+            else:
+                line.append("".join(rng.choices(letters, k=rng.randint(1, 6))))
+        # Every line needs at least one real digit for stage1
+        line.insert(rng.randint(0, len(line)), str(rng.randint(1, 9)))
+        yield "".join(line)
+
+
+def generate_day2(rng: random.Random, scale: float = 1.0) -> Iterator[str]:
+    """Games of cube sets, eg. 'Game 1: 3 blue, 4 red; 1 red, 2 green'"""
+    for game in range(1, max(int(100 * scale), 1) + 1):
+        cube_sets = list()
+        for _ in range(rng.randint(1, 6)):
+            colours = rng.sample(["red", "green", "blue"], rng.randint(1, 3))
+            cube_sets.append(", ".join(f"{rng.randint(1, 20)} {c}" for c in colours))
+        yield f"Game {game}: {'; '.join(cube_sets)}"
+
+
+def generate_day3(
+    rng: random.Random,
+    scale: float = 1.0,
+    width: int | None = None,
+    height: int | None = None,
+) -> Iterator[str]:
+    """A width x height engine schematic, 140 x 140 scaled by area"""
+    side = max(int(140 * math.sqrt(scale)), 1)
+    width = width or side
+    height = height or side
+    for _ in range(height):
+        row = ""
+        while len(row) < width:
+            roll = rng.random()
+            if roll < 0.08:
+                # Numbers are always followed by a '.', so they never merge
+                row += f"{rng.randint(1, 999)}."
+            elif roll < 0.12:
+                row += rng.choice("*#+$/=&@%-")
+            else:
+                row += "." * rng.randint(1, 4)
+        yield row[:width]
+
+
+def generate_day4(
+    rng: random.Random, scale: float = 1.0, density: float = 0.2
+) -> Iterator[str]:
+    """Scratchcards of 10 winning and 25 chosen numbers, where about
+    density of the winning numbers are also chosen"""
+    cards = max(int(200 * scale), 1)
+    for card in range(1, cards + 1):
+        winning = rng.sample(range(1, 100), 10)
+        # Never win copies of cards past the end of the deck
+        matches = min(sum(rng.random() < density for _ in winning), cards - card)
+        others = [n for n in range(1, 100) if n not in winning]
+        chosen = winning[:matches] + rng.sample(others, 25 - matches)
+        rng.shuffle(chosen)
+        yield (
+            f"Card {card:>4}: {' '.join(f'{n:>2}' for n in winning)}"
+            f" | {' '.join(f'{n:>2}' for n in chosen)}"
+        )
+
+
+def generate_day5(
+    rng: random.Random, scale: float = 1.0, span: int = 1 << 32
+) -> Iterator[str]:
+    """An almanac of 10 seed ranges and 7 maps of about 40 ranges each
+    (scaled), all over a space of span values"""
+    seeds = list()
+    for _ in range(10):
+        length = rng.randint(1, max(span // 50, 1))
+        seeds.extend([rng.randrange(span - length + 1), length])
+    yield f"seeds: {' '.join(map(str, seeds))}"
+    # There can't be more ranges than values to cut the space into
+    ranges = min(max(int(40 * scale), 1), span)
+    for name in MAPS:
+        yield ""
+        yield f"{name} map:"
+        # Cut the space into pieces, then lay them out again in a shuffled
+        # order to get each piece's destination
+        cuts = sorted(rng.sample(range(1, span), ranges - 1))
+        pieces = list(zip([0] + cuts, cuts + [span]))
+        order = list(range(len(pieces)))
+        rng.shuffle(order)
+        destinations = dict()
+        dst_start = 0
+        for n in order:
+            destinations[n] = dst_start
+            dst_start += pieces[n][1] - pieces[n][0]
+        for n, (src_start, src_end) in enumerate(pieces):
+            if rng.random() < 0.9:
+                # Leave out a few, they map to themselves
+                yield f"{destinations[n]} {src_start} {src_end - src_start}"
+
+
+def generate_day6(rng: random.Random, scale: float = 1.0) -> Iterator[str]:
+    """Race times and record distances that can always be beaten"""
+    times = list()
+    records = list()
+    for _ in range(max(int(4 * scale), 1)):
+        time = rng.randint(7, 100)
+        best = (time // 2) * (time - time // 2)
+        times.append(time)
+        records.append(rng.randint(0, best - 1))
+    yield "Time:      " + "  ".join(f"{t:>4}" for t in times)
+    yield "Distance:  " + "  ".join(f"{r:>4}" for r in records)
+
+
+def generate_day7(rng: random.Random, scale: float = 1.0) -> Iterator[str]:
+    """Hands of five cards, each with a bid"""
+    for _ in range(max(int(1000 * scale), 1)):
+        yield f"{''.join(rng.choices(CARDS, k=5))} {rng.randint(1, 1000)}"
+
+
+GENERATORS = {
+    1: generate_day1,
+    2: generate_day2,
+    3: generate_day3,
+    4: generate_day4,
+    5: generate_day5,
+    6: generate_day6,
+    7: generate_day7,
+}
+
+
+def generate(day: int, seed: int = 0, scale: float = 1.0, **options) -> str:
+    """A whole generated input as one string, for feeding straight to a day"""
+    rng = random.Random(seed)
+    return "\n".join(GENERATORS[day](rng, scale, **options))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("day", type=int, choices=GENERATORS)
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="multiple of the puzzle size"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--width", type=int, help="day3 schematic width")
+    parser.add_argument("--height", type=int, help="day3 schematic height")
+    parser.add_argument(
+        "--density",
+        type=float,
+        default=0.2,
+        help="day4 share of winning numbers that are also chosen",
+    )
+    parser.add_argument(
+        "--span", type=int, default=1 << 32, help="day5 size of the value space"
+    )
+    parser.add_argument("-o", "--output", help="write here instead of stdout")
+    args = parser.parse_args()
+    if args.span < 1:
+        parser.error("--span must be at least 1")
+
+    options = dict()
+    if args.day == 3:
+        options = {"width": args.width, "height": args.height}
+    elif args.day == 4:
+        options = {"density": args.density}
+    elif args.day == 5:
+        options = {"span": args.span}
+    rng = random.Random(args.seed)
+    # Stream line by line, so huge inputs never sit in memory
+    with open(args.output, mode="w") if args.output else sys.stdout as f:
+        for line in GENERATORS[args.day](rng, args.scale, **options):
+            f.write(line + "\n")
@@ -1,35 +1,252 @@
 """Helper functions for AdventOfCode"""
+
 import requests
+import cProfile
+import inspect
+import io
+import json
 import logging
+import math
+import os
+import pstats
+import re
+import statistics
+import threading
+import tracemalloc
+from functools import partial, wraps
 from time import perf_counter
+from urllib.parse import quote
 
 # Session cookie is valid for 10 years!
 COOKIEFILE = ".session_cookie"
+# Downloaded inputs are kept here, eg. .inputs/2023/day5.txt
+INPUT_DIR = ".inputs"
+# Never touch the network, fail fast if an input isn't already cached
+OFFLINE = os.environ.get("AOC_OFFLINE", "") not in ("", "0")
+# Keep-alive connections the shared session holds open, per host
+POOL_SIZE = 16
+# Benchmark mode for @timethis, eg. AOC_BENCH_REPEAT=20 ./day6.py
+BENCH_REPEAT = int(os.environ.get("AOC_BENCH_REPEAT", "1"))
+BENCH_WARMUP = int(os.environ.get("AOC_BENCH_WARMUP", "0"))
+BENCH_MEMORY = os.environ.get("AOC_BENCH_MEMORY", "") not in ("", "0")
+BENCH_DIR = os.environ.get("AOC_BENCH_DIR", "benchmarks")
+# Profile @timethis functions, AOC_PROFILE=cprofile or AOC_PROFILE=tracemalloc
+PROFILE = os.environ.get("AOC_PROFILE", "")
+PROFILE_DIR = os.environ.get("AOC_PROFILE_DIR", "profiles")
+PROFILE_TOP = int(os.environ.get("AOC_PROFILE_TOP", "20"))
 level = logging.INFO
 fmt = "[%(levelname)s] %(asctime)s - %(message)s"
 logging.basicConfig(level=level, format=fmt)
 
+_session = None
+_session_lock = threading.Lock()
+
+
+def read_cookie(file: str) -> str:
+    """Get the AdventOfCode session cookie we saved earlier"""
+    with open(file, mode="r") as f:
+        return f.read().strip()
+
+
+def get_session() -> requests.Session:
+    """One shared keep-alive session, carrying our cookie, for every request"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.cookies.set("session", read_cookie(COOKIEFILE))
+            _session = session
+    return _session
+
+
+def cache_path(url: str) -> str:
+    """Where the input for a URL is cached on disk"""
+    match = re.search(r"/(\d+)/day/(\d+)/input", url)
+    if match:
+        year, day = match.groups()
+        return os.path.join(INPUT_DIR, year, f"day{day}.txt")
+    return os.path.join(INPUT_DIR, quote(url, safe=""))
+
 
-def read_url(url: str) -> str:
-    """Get the unmolested data from a URL"""
+def _write_file(path: str, content: str) -> None:
+    """Write via a temporary file so readers never see a partial input"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", mode="w") as f:
+        f.write(content)
+    os.replace(f"{path}.tmp", path)
 
-    def read_cookie(file: str) -> str:
-        """Get the AdventOfCode session cookie we saved earlier"""
-        with open(file, mode="r") as f:
-            return f.read().strip()
 
-    session_cookie = {"session": read_cookie(COOKIEFILE)}
-    with requests.get(url=url, timeout=5, cookies=session_cookie) as content:
+def read_url(url: str, revalidate: bool = False, offline: bool = OFFLINE) -> str:
+    """Get the unmolested data from a URL, via the on-disk cache"""
+    path = cache_path(url)
+    cached = os.path.exists(path)
+    if cached and (offline or not revalidate):
+        with open(path, mode="r") as f:
+            return f.read()
+    if offline:
+        raise FileNotFoundError(f"Offline, and no cached input for {url} at {path}")
+
+    # Ask the server to only send the input if it changed since we cached it
+    headers = dict()
+    if cached and os.path.exists(f"{path}.headers"):
+        with open(f"{path}.headers", mode="r") as f:
+            validators = json.load(f)
+        if "ETag" in validators:
+            headers["If-None-Match"] = validators["ETag"]
+        if "Last-Modified" in validators:
+            headers["If-Modified-Since"] = validators["Last-Modified"]
+
+    with get_session().get(url=url, timeout=5, headers=headers) as content:
+        if content.status_code == 304:
+            with open(path, mode="r") as f:
+                return f.read()
+        content.raise_for_status()
+        validators = {
+            k: content.headers[k]
+            for k in ("ETag", "Last-Modified")
+            if k in content.headers
+        }
+        _write_file(path, content.text)
+        _write_file(f"{path}.headers", json.dumps(validators))
         return content.text
 
 
-def timethis(func):
+def summarise(samples: list) -> dict:
+    """Summary statistics, in milliseconds, for a list of timings in seconds"""
+    ordered = sorted(x * 1000 for x in samples)
+    # Nearest-rank percentile, no interpolation
+    p95 = ordered[max(math.ceil(0.95 * len(ordered)) - 1, 0)]
+    return {
+        "runs": len(ordered),
+        "min_ms": ordered[0],
+        "median_ms": statistics.median(ordered),
+        "p95_ms": p95,
+        "stddev_ms": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+    }
+
+
+def benchmark(
+    func,
+    args: tuple = (),
+    kwargs: dict | None = None,
+    repeat: int = 5,
+    warmup: int = 1,
+    memory: bool = False,
+) -> tuple:
+    """Time repeated calls of func(*args, **kwargs) after some warm-up runs"""
+    """Returns the last return value and a dict of results"""
+    kwargs = kwargs or dict()
+    for _ in range(warmup):
+        func(*args, **kwargs)
+    samples = list()
+    for _ in range(max(repeat, 1)):
+        time_before = perf_counter()
+        retval = func(*args, **kwargs)
+        samples.append(perf_counter() - time_before)
+    result = {"name": bench_name(func), **summarise(samples)}
+    if memory:
+        # A separate run, tracemalloc slows everything down and skews timings
+        tracemalloc.start()
+        try:
+            retval = func(*args, **kwargs)
+            result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return retval, result
+
+
+def bench_name(func) -> str:
+    """Name a function by its file and __qualname__, eg. 'day5.stage2'"""
+    func = inspect.unwrap(func)
+    module = os.path.splitext(os.path.basename(func.__code__.co_filename))[0]
+    return f"{module}.{func.__qualname__}"
+
+
+def write_benchmark(result: dict, directory: str = BENCH_DIR) -> str:
+    """Save a benchmark result as JSON, one file per function"""
+    path = os.path.join(directory, f"{result['name']}.json")
+    _write_file(path, json.dumps(result, indent=2))
+    return path
+
+
+def profiled(func, mode: str):
+    """Run func under cProfile or tracemalloc, dumping the raw profile and
+    a summary of the top PROFILE_TOP entries to PROFILE_DIR on every call"""
+    name = bench_name(func)
+    path = os.path.join(PROFILE_DIR, name)
+
+    if mode == "cprofile":
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = cProfile.Profile()
+            try:
+                return profiler.runcall(func, *args, **kwargs)
+            finally:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                profiler.dump_stats(f"{path}.pstats")
+                summary = io.StringIO()
+                stats = pstats.Stats(profiler, stream=summary)
+                stats.sort_stats("tottime").print_stats(PROFILE_TOP)
+                _write_file(f"{path}.txt", summary.getvalue())
+                logging.info(f"({func.__qualname__}) profile -> {path}.pstats")
+
+    elif mode == "tracemalloc":
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            tracemalloc.start()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                snapshot.dump(f"{path}.tracemalloc")
+                top = snapshot.statistics("lineno")[:PROFILE_TOP]
+                _write_file(f"{path}.txt", "\n".join(str(s) for s in top) + "\n")
+                logging.info(f"({func.__qualname__}) profile -> {path}.tracemalloc")
+
+    else:
+        raise ValueError(f"Unknown profile mode {mode!r}, try cprofile or tracemalloc")
+    return wrapper
+
+
+def timethis(
+    func=None,
+    *,
+    repeat: int | None = None,
+    warmup: int | None = None,
+    memory: bool | None = None,
+):
     """Sample decorator to report a function runtime in milliseconds"""
+    """Becomes a benchmark when repeat > 1 or memory is set, either as"""
+    """@timethis(repeat=20) or through the AOC_BENCH_* environment"""
+    if func is None:
+        return partial(timethis, repeat=repeat, warmup=warmup, memory=memory)
+    # Decided once here, so with profiling off nothing extra runs per call
+    target = profiled(func, PROFILE) if PROFILE else func
 
+    @wraps(func)
     def wrapper(*args, **kwargs):
         # Make sure we accept any number of args / keyword args
+        runs = BENCH_REPEAT if repeat is None else repeat
+        warmups = BENCH_WARMUP if warmup is None else warmup
+        traced = BENCH_MEMORY if memory is None else memory
+        if runs > 1 or traced:
+            retval, result = benchmark(target, args, kwargs, runs, warmups, traced)
+            path = write_benchmark(result)
+            logging.info(
+                f"({func.__qualname__}) min {result['min_ms']:.4f} msec,"
+                f" median {result['median_ms']:.4f} msec over {result['runs']}"
+                f" runs -> {path}"
+            )
+            return retval
         time_before = perf_counter()
-        retval = func(*args, **kwargs)
+        retval = target(*args, **kwargs)
         time_after = perf_counter()
         time_diff = time_after - time_before
         # __qualname__ returns the name of the func passed in
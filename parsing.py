@@ -0,0 +1,47 @@
+"""Fast input parsing shared by the days"""
+
+import re
+from typing import Iterator
+
+import numpy as np
+
+# Precompiled, so no day pays for re's pattern cache lookups in a loop
+INT_RE = re.compile(r"-?[0-9]+")
+INT_BYTES_RE = re.compile(rb"-?[0-9]+")
+# Digit runs only, for inputs where '-' is a symbol rather than a sign
+DIGITS_RE = re.compile(r"[0-9]+")
+DIGITS_BYTES_RE = re.compile(rb"[0-9]+")
+
+
+def ints(text: str | bytes, signed: bool = True) -> list:
+    """Every integer in text, in order, found in one pass"""
+    if isinstance(text, bytes):
+        pattern = INT_BYTES_RE if signed else DIGITS_BYTES_RE
+    else:
+        pattern = INT_RE if signed else DIGITS_RE
+    # int() takes bytes as well as str
+    return list(map(int, pattern.findall(text)))
+
+
+def lines(source) -> Iterator[str]:
+    """Yield the non-blank lines of a string or an open file, without the
+    line endings. Files are read a line at a time, never split whole"""
+    if isinstance(source, bytes):
+        source = source.decode()
+    if isinstance(source, str):
+        source = source.split("\n")
+    for line in source:
+        line = line.rstrip("\r\n")
+        if line and not line.isspace():
+            yield line
+
+
+def char_grid(source, fill: str = ".") -> np.ndarray:
+    """Load a block of text (string, bytes or open file) as a 2D uint8 grid
+    of character codes, padding short rows with fill"""
+    rows = [line.encode() for line in lines(source)]
+    if not rows:
+        return np.zeros((0, 0), dtype=np.uint8)
+    width = max(len(row) for row in rows)
+    raw = b"".join(row.ljust(width, fill.encode()) for row in rows)
+    return np.frombuffer(raw, dtype=np.uint8).reshape(len(rows), width)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Download the input of every day into the local input store, concurrently"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import argparse
+
+from helpers import OFFLINE, POOL_SIZE, cache_path, read_url
+from run import discover_days
+
+BASE_URL = "https://adventofcode.com"
+YEAR = 2023
+
+
+def day_urls(days: list, year: int = YEAR, base_url: str = BASE_URL) -> list:
+    """The input URL of each day number"""
+    return [f"{base_url.rstrip('/')}/{year}/day/{day}/input" for day in days]
+
+
+def prefetch(
+    urls: list,
+    concurrency: int = POOL_SIZE,
+    revalidate: bool = False,
+    offline: bool = OFFLINE,
+) -> dict:
+    """Fetch every URL through helpers.read_url, at most concurrency at a
+    time over its shared session, returns {url: error or None}"""
+    # The session keeps POOL_SIZE connections alive, any more threads than
+    # that would have their connections thrown away after each request
+    concurrency = min(concurrency, POOL_SIZE)
+    errors = dict()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            executor.submit(read_url, url, revalidate=revalidate, offline=offline): url
+            for url in urls
+        }
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                future.result()
+                errors[url] = None
+                print(f"{url} -> {cache_path(url)}", flush=True)
+            except Exception as e:
+                errors[url] = f"{type(e).__name__}: {e}"
+                print(f"{url} !! {errors[url]}", flush=True)
+    return errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("days", nargs="*", type=int, help="days to fetch, default all")
+    parser.add_argument("--year", type=int, default=YEAR)
+    parser.add_argument(
+        "--base-url", default=BASE_URL, help="eg. a local stand-in server"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=POOL_SIZE,
+        help=f"downloads at once, at most {POOL_SIZE}",
+    )
+    parser.add_argument(
+        "--revalidate", action="store_true", help="check cached inputs are current"
+    )
+    args = parser.parse_args()
+
+    days = args.days or [int(d[3:]) for d in discover_days()]
+    urls = day_urls(days, args.year, args.base_url)
+    errors = prefetch(urls, args.concurrency, args.revalidate)
+    if any(errors.values()):
+        raise SystemExit(1)
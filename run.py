@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Run the stages of every day, or just some of them, in parallel"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+import argparse
+import contextlib
+import glob
+import importlib
+import io
+import os
+import re
+
+STAGES = ("stage1_test", "stage1", "stage2_test", "stage2")
+
+
+def discover_days() -> list:
+    """Return the day modules next to this file, eg. ['day1', 'day2', ...]"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    days = list()
+    for path in glob.glob(os.path.join(here, "day*.py")):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if re.fullmatch("day[0-9]+", name):
+            days.append(name)
+    return sorted(days, key=lambda d: int(d[3:]))
+
+
+def run_day(day: str, stages: list) -> list:
+    """Import a day only now, then run its stages capturing their output"""
+    module = importlib.import_module(day)
+    results = list()
+    for stage in stages:
+        func = getattr(module, stage, None)
+        if func is None:
+            continue
+        output = io.StringIO()
+        error = None
+        time_before = perf_counter()
+        try:
+            with contextlib.redirect_stdout(output):
+                func()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        time_diff = perf_counter() - time_before
+        results.append(
+            {
+                "day": day,
+                "stage": stage,
+                "msec": time_diff * 1000,
+                "output": output.getvalue(),
+                "error": error,
+            }
+        )
+    return results
+
+
+def print_table(results: list) -> None:
+    """One row per stage run, in day and stage order"""
+    print(f"{'day':6} {'stage':12} {'msec':>12}  status")
+    for r in results:
+        status = "ok" if r["error"] is None else r["error"]
+        print(f"{r['day']:6} {r['stage']:12} {r['msec']:12.3f}  {status}")
+    print(f"{'total':19} {sum(r['msec'] for r in results):12.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("days", nargs="*", type=int, help="days to run, default all")
+    parser.add_argument(
+        "--stages", nargs="+", choices=STAGES, default=STAGES, help="stages to run"
+    )
+    parser.add_argument(
+        "--test", action="store_true", help="only run the example stages"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(), help="days run at once"
+    )
+    parser.add_argument(
+        "--profile",
+        choices=("cprofile", "tracemalloc"),
+        help="profile the @timethis stages, see helpers.PROFILE",
+    )
+    args = parser.parse_args()
+    if args.profile:
+        # Read by helpers as each day is imported in its worker
+        os.environ["AOC_PROFILE"] = args.profile
+
+    days = discover_days()
+    if args.days:
+        days = [d for d in days if int(d[3:]) in args.days]
+    stages = [s for s in args.stages if s.endswith("_test") or not args.test]
+
+    results = list()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(run_day, day, stages): day for day in days}
+        for future in as_completed(futures):
+            day_results = future.result()
+            print(f"--- {futures[future]}")
+            for r in day_results:
+                print(r["output"], end="")
+            results.extend(day_results)
+
+    order = {day: n for n, day in enumerate(days)}
+    results.sort(key=lambda r: (order[r["day"]], stages.index(r["stage"])))
+    print()
+    print_table(results)
@@ -21,23 +21,26 @@ def solve_thing(input: str) -> None:
     print(input)
 
 
-if __name__ == "__main__":
+def stage1_test():
+    thing = parse_thing(TEST)
+    solve_thing(thing)
+
+
+def stage1():
+    thing = parse_thing(read_url(URL))
+    solve_thing(thing)
 
-    def stage1_test():
-        thing = parse_thing(TEST)
-        solve_thing(thing)
 
-    def stage1():
-        thing = parse_thing(read_url(URL))
-        solve_thing(thing)
+def stage2_test():
+    pass
 
-    def stage2_test():
-        pass
 
-    @timethis
-    def stage2():
-        pass
+@timethis
+def stage2():
+    pass
 
+
+if __name__ == "__main__":
     stage1_test()
     stage1()
     stage2_test()
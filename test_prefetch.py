@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Check prefetch.py against a local stand-in for the puzzle server"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+import helpers
+import prefetch
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+YEAR = 2023
+# The days the stand-in server knows, anything else is a 404
+INPUTS = {1: "1abc2\npqr3stu8vwx\n", 2: "Game 1: 3 blue, 4 red\n"}
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Serves INPUTS at /<year>/day/<n>/input, with an ETag per day"""
+
+    def do_GET(self):
+        self.server.hits.append((self.path, self.headers.get("If-None-Match")))
+        day = self.path.split("/")[-2]
+        if self.path != f"/{YEAR}/day/{day}/input" or int(day) not in INPUTS:
+            self.send_error(404)
+            return
+        etag = f'"day{day}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = INPUTS[int(day)].encode()
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PrefetchTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+        self.server.hits = list()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmpdir.name, ".session_cookie"), "w") as f:
+            f.write("stand-in\n")
+        # Point the cache and cookie at the temporary directory
+        self.saved = (helpers.INPUT_DIR, helpers.COOKIEFILE, helpers._session)
+        helpers.INPUT_DIR = os.path.join(self.tmpdir.name, ".inputs")
+        helpers.COOKIEFILE = os.path.join(self.tmpdir.name, ".session_cookie")
+        helpers._session = None
+
+    def tearDown(self):
+        helpers.INPUT_DIR, helpers.COOKIEFILE, helpers._session = self.saved
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def urls(self, days):
+        return prefetch.day_urls(days, YEAR, base_url=self.base_url)
+
+    def cached(self, day):
+        path = os.path.join(helpers.INPUT_DIR, str(YEAR), f"day{day}.txt")
+        with open(path) as f:
+            return f.read()
+
+    def test_fresh_fetch(self):
+        errors = prefetch.prefetch(self.urls([1, 2]))
+        self.assertEqual(list(errors.values()), [None, None])
+        self.assertEqual(self.cached(1), INPUTS[1])
+        self.assertEqual(self.cached(2), INPUTS[2])
+
+    def test_cached_inputs_are_not_fetched_again(self):
+        prefetch.prefetch(self.urls([1]))
+        prefetch.prefetch(self.urls([1]))
+        self.assertEqual(len(self.server.hits), 1)
+
+    def test_revalidate_gets_304(self):
+        prefetch.prefetch(self.urls([1]))
+        errors = prefetch.prefetch(self.urls([1]), revalidate=True)
+        self.assertEqual(list(errors.values()), [None])
+        self.assertEqual(self.server.hits[-1][1], '"day1"')
+        self.assertEqual(self.cached(1), INPUTS[1])
+
+    def test_concurrency_keeps_connections(self):
+        # More threads than the session's pool would discard connections
+        saved = dict(INPUTS)
+        INPUTS.update({day: f"day {day}\n" for day in range(3, 41)})
+        try:
+            with self.assertNoLogs("urllib3.connectionpool", level="WARNING"):
+                errors = prefetch.prefetch(self.urls(range(1, 41)), concurrency=40)
+        finally:
+            INPUTS.clear()
+            INPUTS.update(saved)
+        self.assertFalse(any(errors.values()))
+
+    def test_offline_without_cache(self):
+        errors = prefetch.prefetch(self.urls([1]), offline=True)
+        self.assertTrue(errors[self.urls([1])[0]].startswith("FileNotFoundError"))
+        self.assertEqual(self.server.hits, [])
+
+    def test_404_exits_1(self):
+        # Through the command line, in the temporary directory so the
+        # relative cookie and input paths land there
+        result = subprocess.run(
+            [sys.executable, os.path.join(HERE, "prefetch.py"), "1", "9"]
+            + ["--base-url", self.base_url],
+            cwd=self.tmpdir.name,
+            env={**os.environ, "PYTHONPATH": HERE, "AOC_OFFLINE": "0"},
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(result.returncode, 1, result.stdout + result.stderr)
+        self.assertIn("HTTPError", result.stdout)
+        self.assertTrue(
+            os.path.exists(os.path.join(self.tmpdir.name, ".inputs/2023/day1.txt"))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()